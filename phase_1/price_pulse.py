@@ -1,25 +1,35 @@
 """
 Crypto Crawler Challenge - Phase 1: Price Pulse
 
-Polls CoinGecko's API for the live Bitcoin price every second,
-prints the price and a simple moving average (SMA) of the last 10 prices,
-handles network errors robustly with exponential backoff,
+Polls CoinGecko's API for the live Bitcoin price every second (configurable),
+logs each new quote and a simple moving average (SMA) of the last 10 prices,
+retries network errors with exponential backoff over a keep-alive HTTP session,
+slows down when rate limited (HTTP 429),
 and exits gracefully on SIGINT (Ctrl-C).
 
 Usage:
-    python price_pulse.py
+    python price_pulse.py [--interval SECONDS]
+
+The interval may also be set via the PRICE_INTERVAL environment variable.
 """
 
+import argparse
+import os
+import orjson
 import requests
-import time
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import signal
 import sys
+import threading
 import logging
+import math
+import random
 from collections import deque
-from datetime import datetime
-from typing import Tuple, Deque
+from datetime import datetime, timezone
+from typing import Tuple, Deque, Optional
 
-should_shutdown: bool = False
+SHUTDOWN: threading.Event = threading.Event()
 
 
 def signal_handler(sig: int, frame) -> None:
@@ -30,9 +40,8 @@ def signal_handler(sig: int, frame) -> None:
         sig (int): Signal number.
         frame: Current stack frame.
     """
-    global should_shutdown
     print("\nShutting down...")
-    should_shutdown = True
+    SHUTDOWN.set()
 
 
 # Register the signal handler for SIGINT (Ctrl-C)
@@ -51,64 +60,174 @@ PARAMS: dict = {
     "vs_currencies": "usd",
     "include_last_updated_at": "true"
 }
+# Upper bound for the polling interval while rate limited
+MAX_INTERVAL: float = 30.0
+# Consecutive successful polls before the interval relaxes back toward its base
+RELAX_AFTER: int = 10
+SMA_WINDOW: int = 10
+# Recompute the running sum from scratch this often to shed float drift
+SMA_RESYNC_EVERY: int = 3600
+
+# One keep-alive connection for the sequential poller. Retries are kept short
+# and exclude 429 so throttling and long waits are handled in main(), where
+# SHUTDOWN.wait() keeps them interruptible by Ctrl-C.
+RETRY = Retry(
+    total=2,
+    backoff_factor=0.5,
+    backoff_jitter=0.25,
+    status_forcelist=[500, 502, 503, 504],
+    allowed_methods=["GET"],
+    raise_on_status=False
+)
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=1, max_retries=RETRY))
 
 
-def fetch_price() -> Tuple[float, str]:
+def positive_seconds(value: str) -> float:
+    """
+    Parses a polling interval, rejecting zero, negative and non-finite values.
+
+    Args:
+        value: Interval as given on the command line or in PRICE_INTERVAL.
+
+    Returns:
+        float: The interval in seconds.
+
+    Raises:
+        argparse.ArgumentTypeError: If the value is not a positive number.
+    """
+    try:
+        seconds = float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"not a number: {value!r}")
+    if not (math.isfinite(seconds) and seconds > 0):
+        raise argparse.ArgumentTypeError(f"must be a positive number of seconds: {value!r}")
+    return seconds
+
+
+def parse_args() -> argparse.Namespace:
+    """
+    Parses command-line arguments.
+
+    Returns:
+        argparse.Namespace: Parsed arguments.
+    """
+    parser = argparse.ArgumentParser(description="Poll the live BTC price from CoinGecko.")
+    parser.add_argument(
+        "--interval",
+        type=positive_seconds,
+        # A string default is passed through `type`, so PRICE_INTERVAL is validated too
+        default=os.getenv("PRICE_INTERVAL", "1.0"),
+        help="Seconds between polls (default: $PRICE_INTERVAL or 1.0)"
+    )
+    return parser.parse_args()
+
+
+def retry_after_seconds(resp: requests.Response, default: float) -> float:
+    """
+    Reads the Retry-After header of a response.
+
+    Args:
+        resp: The rate-limited response.
+        default: Value to use if the header is missing or not in seconds.
+
+    Returns:
+        float: Seconds to wait before the next request.
+    """
+    try:
+        return float(resp.headers["Retry-After"])
+    except (KeyError, ValueError):
+        return default
+
+
+def fetch_price() -> Tuple[float, int]:
     """
     Fetches the current Bitcoin price in USD and its last updated timestamp.
 
     Returns:
-        Tuple[float, str]: A tuple containing the price and the formatted UTC timestamp.
+        Tuple[float, int]: A tuple containing the price and its Unix update time.
 
     Raises:
         requests.RequestException: If the HTTP request fails.
         ValueError: If the expected data is missing from the response.
     """
-    resp = requests.get(API_URL, params=PARAMS, timeout=10)
+    resp = SESSION.get(API_URL, params=PARAMS, timeout=10)
     resp.raise_for_status()
-    data = resp.json()
+    data = orjson.loads(resp.content)
     price = data["bitcoin"]["usd"]
     ts_unix = data["bitcoin"]["last_updated_at"]
-    dt = datetime.utcfromtimestamp(ts_unix).strftime("%Y-%m-%dT%H:%M:%S")
-    return price, dt
+    return price, ts_unix
 
 
 def main() -> None:
     """
     Runs the main polling loop.
 
-    - Fetches and prints BTC price and SMA(10) every second.
-    - Handles exponential backoff on API errors.
+    - Fetches the BTC price every interval; logs it and SMA(10) only when
+      CoinGecko's last_updated_at has moved (repeat quotes are skipped).
+    - Relies on the session's retry policy for transient API errors and
+      backs off exponentially (with jitter) once those retries are exhausted.
+    - On HTTP 429, honors Retry-After and lengthens the interval, relaxing
+      back to the configured value after sustained successes.
     - Logs warnings and errors.
     - Exits gracefully on SIGINT.
     """
-    price_window: Deque[float] = deque(maxlen=10)
+    args = parse_args()
+    base_interval: float = args.interval
+    interval: float = base_interval
+    price_window: Deque[float] = deque(maxlen=SMA_WINDOW)
+    window_sum: float = 0.0
+    ticks: int = 0
     consecutive_failures: int = 0
+    consecutive_successes: int = 0
     backoff: int = 1
+    last_ts_unix: Optional[int] = None
 
-    while not should_shutdown:
+    while not SHUTDOWN.is_set():
         try:
-            price, timestamp = fetch_price()
-            price_window.append(price)
-            sma = sum(price_window) / len(price_window) if price_window else price
-            print(f"[{timestamp}] BTC → USD: ${price:,.2f} | SMA(10): ${sma:,.2f}")
+            price, ts_unix = fetch_price()
+            if ts_unix != last_ts_unix:
+                last_ts_unix = ts_unix
+                if len(price_window) == price_window.maxlen:
+                    window_sum -= price_window[0]
+                price_window.append(price)
+                window_sum += price
+                ticks += 1
+                if ticks % SMA_RESYNC_EVERY == 0:
+                    window_sum = math.fsum(price_window)
+                sma = window_sum / len(price_window)
+                timestamp = datetime.fromtimestamp(ts_unix, tz=timezone.utc).replace(
+                    tzinfo=None).isoformat(timespec="seconds")
+                logging.info("BTC → USD: $%s | SMA(10): $%s (updated %s UTC)",
+                             f"{price:,.2f}", f"{sma:,.2f}", timestamp)
 
             consecutive_failures = 0
             backoff = 1
-            for _ in range(10):
-                if should_shutdown:
-                    break
-                time.sleep(0.1)
+            consecutive_successes += 1
+            if interval > base_interval and consecutive_successes >= RELAX_AFTER:
+                interval = max(interval / 1.5, base_interval)
+                consecutive_successes = 0
+                logging.info("Relaxing polling interval to %.1f seconds", interval)
+            delay = interval
         except (requests.RequestException, ValueError) as e:
             logging.warning("%s", e)
             consecutive_failures += 1
-            logging.info("Retrying in %d seconds...", backoff)
-            time.sleep(backoff)
+            consecutive_successes = 0
+            delay = backoff * (0.5 + random.random())
+            if (isinstance(e, requests.HTTPError) and e.response is not None
+                    and e.response.status_code == 429):
+                interval = min(interval * 1.5, max(MAX_INTERVAL, base_interval))
+                delay = max(delay, interval, retry_after_seconds(e.response, delay))
+                logging.warning("Rate limited; polling every %.1f seconds", interval)
+            logging.info("Retrying in %.1f seconds...", delay)
             backoff = min(backoff * 2, 60)
 
             if consecutive_failures >= 5:
                 logging.error("5 consecutive failures. Continuing to poll...")
 
+        if SHUTDOWN.wait(delay):
+            break
+
     sys.exit(0)
 
 
@@ -5,17 +5,30 @@ Scrapes the top 100 cryptocurrencies from https://coinmarketcap.com/ (pages 1–
 extracting Rank, Name, Symbol, Price (USD), 24h % Change, and Market Cap (USD),
 and writes the results to a CSV file.
 
+Coin data is read from the page's embedded Next.js JSON payload
+(<script id="__NEXT_DATA__">) when present, falling back to the HTML table.
+
+Pages are cached under data/.cache/ and reused for --max-age seconds;
+after that they are revalidated with their ETag (If-None-Match).
+
 Usage:
-    python cmc_html_scraper.py
+    python cmc_html_scraper.py [--max-age SECONDS]
 """
 
+import argparse
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from lxml import etree
 import csv
-import time
+import json
 import logging
 import os
-from typing import List, Dict
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, List, Dict, Optional, Tuple
 
 # Setup logging
 logging.basicConfig(
@@ -24,99 +37,383 @@ logging.basicConfig(
 )
 
 BASE_URL = "https://coinmarketcap.com/"
+PAGES = 5
+TOP_N = 100
 OUTPUT_CSV = "data/cmc_top100_html.csv"
+CACHE_DIR = "data/.cache"
+DEFAULT_MAX_AGE = 60.0
+FIELDNAMES = ("Rank", "Name", "Symbol", "Price (USD)", "24h % Change", "Market Cap (USD)")
 
 HEADERS = {
-    "User-Agent": "Mozilla/5.0"
+    "User-Agent": "Mozilla/5.0",
+    "Accept-Encoding": "gzip, br"
 }
 
+# Session for the concurrent page fetches: one pooled keep-alive connection
+# per page, retrying throttled (429, honoring Retry-After) and 5xx responses
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(
+    pool_connections=1,
+    pool_maxsize=PAGES,
+    max_retries=Retry(
+        total=5,
+        backoff_factor=1,
+        backoff_jitter=0.5,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=["GET"],
+        raise_on_status=False
+    )
+))
+SESSION.headers.update(HEADERS)
+
+# XPath queries compiled once and reused for every page and table row
+ROWS_XPATH = etree.XPath("//tbody/tr")
+CELLS_XPATH = etree.XPath("./td")
+PARAGRAPHS_XPATH = etree.XPath(".//p")
+
+# Body of the Next.js <script id="__NEXT_DATA__"> tag, matched on the raw bytes
+NEXT_DATA_RE = re.compile(rb'id="__NEXT_DATA__"[^>]*>(.*?)</script>', re.S)
+
+# Dollar amounts such as "$67,123.45"; the market cap cell may be prefixed
+# with an abbreviated figure ("$1.33T$1,333,456,789,012"), so match its tail
+PRICE_RE = re.compile(r'^\$?([0-9,]+(?:\.[0-9]+)?)$')
+MARKET_CAP_RE = re.compile(r'\$?([0-9,]+(?:\.[0-9]+)?)$')
+
 
-def parse_coin_row(tr) -> Dict[str, str]:
+def element_text(el: etree._Element) -> str:
+    """
+    Concatenates the stripped text fragments of an element and its descendants.
+
+    Args:
+        el: lxml element.
+
+    Returns:
+        str: The element's text content.
+    """
+    return "".join(t.strip() for t in el.itertext())
+
+
+def parse_coin_row(tr: etree._Element) -> Optional[Tuple[str, ...]]:
     """
     Parses a single row of the CoinMarketCap table.
 
     Args:
-        tr: BeautifulSoup Tag object for the row.
+        tr: lxml element for the row.
 
     Returns:
-        Dict[str, str]: Parsed coin data, or empty dict if not a coin row.
+        Optional[Tuple[str, ...]]: Coin row in FIELDNAMES order, or None if not a coin row.
     """
-    tds = tr.find_all('td')
+    tds = CELLS_XPATH(tr)
     if len(tds) < 8:
-        return {}
+        return None
     try:
-        rank = tds[1].get_text(strip=True)
+        rank = element_text(tds[1])
         name = ""
         symbol = ""
-        p_tags = tds[2].find_all('p')
+        p_tags = PARAGRAPHS_XPATH(tds[2])
         if len(p_tags) >= 2:
-            name = p_tags[0].get_text(strip=True)
-            symbol = p_tags[1].get_text(strip=True)
+            name = element_text(p_tags[0])
+            symbol = element_text(p_tags[1])
         else:
-            cell_text = tds[2].get_text(strip=True)
+            cell_text = element_text(tds[2])
             if cell_text:
                 parts = cell_text.split()
                 name = parts[0] if parts else ""
                 symbol = parts[1] if len(parts) > 1 else ""
 
-        price = tds[3].get_text(strip=True).replace('$', '').replace(',', '')
-        change_24h = tds[4].get_text(strip=True).replace('%', '')
-        market_cap = tds[7].get_text(strip=True).replace('$', '').replace(',', '')
-
-        if not name or not symbol or not price.replace('.', '', 1).isdigit():
-            return {}
-
-        return {
-            "Rank": rank,
-            "Name": name,
-            "Symbol": symbol,
-            "Price (USD)": price,
-            "24h % Change": change_24h,
-            "Market Cap (USD)": market_cap
-        }
+        price_match = PRICE_RE.match(element_text(tds[3]))
+        if not name or not symbol or not price_match:
+            return None
+        price = price_match.group(1).replace(',', '')
+        change_24h = element_text(tds[4]).replace('%', '')
+        market_cap_match = MARKET_CAP_RE.search(element_text(tds[7]))
+        market_cap = market_cap_match.group(1).replace(',', '') if market_cap_match else ""
+
+        return rank, name, symbol, price, change_24h, market_cap
     except Exception as e:
         logging.warning(f"Failed to parse row: {e}")
-        return {}
+        return None
+
+
+def listing_value(record: Dict[str, Any], path: str) -> Any:
+    """
+    Looks up a dotted field (e.g. "quote.USD.price") in a listing record.
+
+    Handles both flattened records keyed by the full dotted path and
+    nested dictionaries.
+
+    Args:
+        record: Listing record.
+        path: Dotted field path.
 
+    Returns:
+        Any: The field value.
 
-def scrape_cmc_top_100() -> List[Dict[str, str]]:
+    Raises:
+        KeyError: If the field is missing.
+    """
+    if path in record:
+        return record[path]
+    value = record
+    for key in path.split('.'):
+        value = value[key]
+    return value
+
+
+def parse_next_data(raw: bytes) -> List[Tuple[str, ...]]:
+    """
+    Extracts coin data from CoinMarketCap's __NEXT_DATA__ JSON payload.
+
+    Args:
+        raw: Body of the __NEXT_DATA__ script tag.
+
+    Returns:
+        List[Tuple[str, ...]]: Coin rows, or empty list if the payload is unusable.
+    """
+    try:
+        state = json.loads(raw)["props"]["initialState"]
+        if isinstance(state, str):
+            state = json.loads(state)
+        listing = state["cryptocurrency"]["listingLatest"]["data"]
+    except (ValueError, KeyError, TypeError) as e:
+        logging.warning(f"Unusable __NEXT_DATA__ payload: {e}")
+        return []
+
+    # Listings may be packed as a header of keys followed by rows of values
+    if listing and isinstance(listing[0], dict) and "keysArr" in listing[0]:
+        keys = listing[0]["keysArr"]
+        records = [dict(zip(keys, values)) for values in listing[1:]]
+    else:
+        records = listing
+
+    coins = []
+    for record in records:
+        try:
+            price = listing_value(record, "quote.USD.price")
+            percent_change_24h = listing_value(record, "quote.USD.percentChange24h")
+            market_cap = listing_value(record, "quote.USD.marketCap")
+            coins.append((
+                str(listing_value(record, "cmcRank")),
+                listing_value(record, "name"),
+                listing_value(record, "symbol"),
+                f"{price:.8f}".rstrip('0').rstrip('.'),
+                f"{percent_change_24h:.2f}",
+                f"{market_cap:.2f}".rstrip('0').rstrip('.'),
+            ))
+        except Exception as e:
+            logging.warning(f"Failed to parse listing record: {e}")
+    return coins
+
+
+def page_url(page: int) -> str:
+    """
+    Builds the URL of a CoinMarketCap listing page.
+
+    Args:
+        page: 1-based page number.
+
+    Returns:
+        str: Page URL.
+    """
+    return BASE_URL + (f"?page={page}" if page > 1 else "")
+
+
+def fetch_page(url: str, etag: Optional[str] = None) -> requests.Response:
+    """
+    Requests a single CoinMarketCap listing page.
+
+    Args:
+        url: Page URL.
+        etag: ETag of a cached copy; sent as If-None-Match if given.
+
+    Returns:
+        requests.Response: The successful (or 304 Not Modified) response.
+
+    Raises:
+        requests.RequestException: If the HTTP request fails.
+    """
+    logging.info(f"Fetching {url}")
+    headers = {"If-None-Match": etag} if etag else None
+    resp = SESSION.get(url, headers=headers, timeout=10)
+    resp.raise_for_status()
+    return resp
+
+
+def declared_charset(resp: requests.Response) -> Optional[str]:
+    """
+    Returns the charset declared in a response's Content-Type header.
+
+    Unlike resp.encoding, this does not fall back to ISO-8859-1 for text/html
+    without a charset, so lxml can detect the encoding from <meta charset>.
+
+    Args:
+        resp: HTTP response.
+
+    Returns:
+        Optional[str]: The declared charset, or None if there is none.
+    """
+    for param in resp.headers.get("Content-Type", "").split(";")[1:]:
+        key, _, value = param.partition("=")
+        if key.strip().lower() == "charset":
+            return value.strip().strip('"\'') or None
+    return None
+
+
+def parse_table(body: bytes, encoding: Optional[str] = None) -> Tuple[List[Tuple[str, ...]], int]:
+    """
+    Parses coin rows from a listing page's HTML table.
+
+    Args:
+        body: Raw page HTML.
+        encoding: Character encoding of the HTML, or None to let lxml detect it.
+
+    Returns:
+        Tuple[List[Tuple[str, ...]], int]: Coin rows and the number of table rows seen.
+    """
+    if not body.strip():
+        return [], 0
+    tree = etree.fromstring(body, etree.HTMLParser(encoding=encoding))
+    if tree is None:
+        return [], 0
+    rows = ROWS_XPATH(tree)
+    coins = [data for data in map(parse_coin_row, rows) if data]
+    return coins, len(rows)
+
+
+def parse_page(body: bytes, encoding: Optional[str] = None) -> Tuple[List[Tuple[str, ...]], int]:
+    """
+    Parses coins from a listing page.
+
+    The embedded __NEXT_DATA__ JSON holds the full listing and is read
+    straight from the raw bytes without building a DOM; the HTML table is
+    parsed only if the payload is missing or unusable.
+
+    Args:
+        body: Raw page HTML, from the response or the cache.
+        encoding: Character encoding of the HTML, or None to let lxml detect it.
+
+    Returns:
+        Tuple[List[Tuple[str, ...]], int]: Coin rows and the number of rows seen.
+    """
+    match = NEXT_DATA_RE.search(body)
+    if match:
+        coins = parse_next_data(match.group(1))
+        if coins:
+            return coins, len(coins)
+        logging.info("Falling back to HTML table rows")
+    return parse_table(body, encoding)
+
+
+def read_cached_body(path: str) -> bytes:
+    """
+    Reads a cached page body.
+
+    Args:
+        path: Cache file path.
+
+    Returns:
+        bytes: The cached HTML.
+    """
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def fetch_and_parse(page: int, max_age: float = DEFAULT_MAX_AGE) -> Tuple[List[Tuple[str, ...]], int]:
+    """
+    Fetches a listing page and parses it on the calling (worker) thread.
+
+    A cached copy younger than max_age is parsed without any request.
+    Older copies are revalidated with their ETag; on 304 Not Modified the
+    cached HTML is parsed, otherwise the new body is parsed. The cache
+    (body plus a JSON sidecar with its ETag and declared charset) is only
+    replaced if the page yielded coins, so block or challenge pages are
+    never cached.
+
+    Args:
+        page: 1-based page number.
+        max_age: Seconds a cached page is used without revalidation.
+
+    Returns:
+        Tuple[List[Tuple[str, ...]], int]: Coin rows and the number of rows seen.
+
+    Raises:
+        requests.RequestException: If the HTTP request fails.
+    """
+    body_path = os.path.join(CACHE_DIR, f"cmc_page_{page}.html")
+    meta_path = body_path + ".json"
+    meta: Dict[str, Optional[str]] = {}
+    cached = os.path.exists(body_path)
+    if cached and os.path.exists(meta_path):
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+
+    if cached and time.time() - os.path.getmtime(body_path) < max_age:
+        logging.info(f"Using cached page {page}")
+        return parse_page(read_cached_body(body_path), meta.get("encoding"))
+
+    resp = fetch_page(page_url(page), meta.get("etag"))
+    if resp.status_code == 304:
+        logging.info(f"Page {page} not modified, using cached copy")
+        os.utime(body_path)
+        return parse_page(read_cached_body(body_path), meta.get("encoding"))
+
+    encoding = declared_charset(resp)
+    result = parse_page(resp.content, encoding)
+    if not result[0]:
+        logging.warning(f"Page {page} yielded no coins; not caching it")
+        return result
+
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp_path = body_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(resp.content)
+    os.replace(tmp_path, body_path)
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump({"etag": resp.headers.get("ETag"), "encoding": encoding}, f)
+    return result
+
+
+def scrape_cmc_top_100(max_age: float = DEFAULT_MAX_AGE) -> List[Tuple[str, ...]]:
     """
     Scrapes the top 100 cryptocurrencies from CoinMarketCap (pages 1–5).
 
+    Page 1 is fetched first; its __NEXT_DATA__ listing usually covers the
+    whole top 100. Only if it falls short are pages 2–5 fetched and parsed
+    concurrently on a thread pool. Results are merged in page order so the
+    output stays sorted by rank.
+
+    Args:
+        max_age: Seconds a cached page is used without revalidation.
+
     Returns:
-        List[Dict[str, str]]: List of coin data dictionaries.
+        List[Tuple[str, ...]]: Coin rows in FIELDNAMES order.
     """
+    fetch = partial(fetch_and_parse, max_age=max_age)
+    results = [fetch(1)]
+    if len(results[0][0]) >= TOP_N:
+        logging.info(f"Page 1 holds the top {TOP_N}, skipping pages 2–{PAGES}")
+    else:
+        with ThreadPoolExecutor(max_workers=PAGES - 1) as executor:
+            results.extend(executor.map(fetch, range(2, PAGES + 1)))
+
     all_coins = []
-    for page in range(1, 6):
-        url = BASE_URL + (f"?page={page}" if page > 1 else "")
-        logging.info(f"Fetching {url}")
-        resp = requests.get(url, headers=HEADERS, timeout=10)
-        resp.raise_for_status()
-        soup = BeautifulSoup(resp.text, "html.parser")
-        table = soup.find('tbody')
-        if not table:
+    for page, (coins, rows) in enumerate(results, start=1):
+        if not rows:
             logging.error("Failed to find coin table.")
             continue
-        rows = table.find_all('tr')
-        logging.info(f"Page {page} rows: {len(rows)}")
-        parsed_this_page = 0
-        for tr in rows:
-            data = parse_coin_row(tr)
-            if data:
-                all_coins.append(data)
-                parsed_this_page += 1
-        logging.info(f"Parsed {parsed_this_page} coins from page {page}")
-        time.sleep(1)
+        logging.info(f"Page {page} rows: {rows}")
+        all_coins.extend(coins)
+        logging.info(f"Parsed {len(coins)} coins from page {page}")
     logging.info(f"Total real coins scraped: {len(all_coins)}")
     return all_coins
 
 
-def write_to_csv(coins: List[Dict[str, str]], filename: str) -> None:
+def write_to_csv(coins: List[Tuple[str, ...]], filename: str) -> None:
     """
     Writes coin data to CSV.
 
     Args:
-        coins: List of coin data dictionaries.
+        coins: Coin rows in FIELDNAMES order.
         filename: Output CSV filename.
     """
     if not coins:
@@ -125,21 +422,37 @@ def write_to_csv(coins: List[Dict[str, str]], filename: str) -> None:
 
     os.makedirs(os.path.dirname(filename), exist_ok=True)
 
-    fieldnames = ["Rank", "Name", "Symbol", "Price (USD)", "24h % Change", "Market Cap (USD)"]
-    with open(filename, "w", newline='', encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
+    with open(filename, "w", newline='', encoding="utf-8", buffering=1 << 20) as f:
+        writer = csv.writer(f)
+        writer.writerow(FIELDNAMES)
         writer.writerows(coins)
     logging.info(f"Wrote {len(coins)} records to {filename}")
 
 
+def parse_args() -> argparse.Namespace:
+    """
+    Parses command-line arguments.
+
+    Returns:
+        argparse.Namespace: Parsed arguments.
+    """
+    parser = argparse.ArgumentParser(description="Scrape the CoinMarketCap top 100 to CSV.")
+    parser.add_argument(
+        "--max-age",
+        type=float,
+        default=DEFAULT_MAX_AGE,
+        help=f"Seconds to reuse cached pages before revalidating (default: {DEFAULT_MAX_AGE:g})"
+    )
+    return parser.parse_args()
+
+
 def main() -> None:
     """
     Main entry point for scraping and saving data.
     """
-    coins = scrape_cmc_top_100()
-    top_100 = coins[:100]
-    write_to_csv(top_100, OUTPUT_CSV)
+    args = parse_args()
+    coins = scrape_cmc_top_100(args.max_age)
+    write_to_csv(coins[:TOP_N], OUTPUT_CSV)
 
 
 if __name__ == "__main__":
@@ -9,12 +9,15 @@ Usage:
     python cmc_json_scraper.py
 """
 
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import csv
 import logging
 import os
 import time
-from typing import List, Dict
+from typing import List, Tuple
 
 logging.basicConfig(
     level=logging.INFO,
@@ -23,14 +26,31 @@ logging.basicConfig(
 
 JSON_API_URL = "https://api.coingecko.com/api/v3/coins/markets"
 OUTPUT_CSV = "data/cmc_top100_json.csv"
+FIELDNAMES = ("Rank", "Name", "Symbol", "Price (USD)", "24h % Change", "Market Cap (USD)")
 
+HEADERS = {
+    "Accept-Encoding": "gzip, br"
+}
 
-def fetch_top_100_coingecko() -> List[Dict[str, str]]:
+# The single markets request is worth waiting for: retry it a few times
+# with longer backoff, since CoinGecko's free tier throttles per minute
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(max_retries=Retry(
+    total=3,
+    backoff_factor=2,
+    status_forcelist=[429, 500, 502, 503, 504],
+    allowed_methods=["GET"],
+    raise_on_status=False
+)))
+SESSION.headers.update(HEADERS)
+
+
+def fetch_top_100_coingecko() -> List[Tuple[str, ...]]:
     """
     Fetches the top 100 coins using CoinGecko's public API.
 
     Returns:
-        List[Dict[str, str]]: List of coin data dictionaries.
+        List[Tuple[str, ...]]: Coin rows in FIELDNAMES order.
     """
     params = {
         "vs_currency": "usd",
@@ -40,46 +60,42 @@ def fetch_top_100_coingecko() -> List[Dict[str, str]]:
         "sparkline": "false"
     }
     start_time = time.time()
-    resp = requests.get(JSON_API_URL, params=params, timeout=10)
+    resp = SESSION.get(JSON_API_URL, params=params, timeout=10)
     duration = time.time() - start_time
     resp.raise_for_status()
-    data = resp.json()
+    data = orjson.loads(resp.content)
     logging.info(f"Fetched {len(data)} coins from CoinGecko API in {duration:.3f} seconds")
     coins = []
     for idx, coin in enumerate(data, start=1):
         try:
-            price = coin["current_price"]
-            percent_change_24h = coin["price_change_percentage_24h"]
-            market_cap = coin["market_cap"]
-            coins.append({
-                "Rank": idx,
-                "Name": coin["name"],
-                "Symbol": coin["symbol"].upper(),
-                "Price (USD)": f"{price:.8f}".rstrip('0').rstrip('.'),
-                "24h % Change": f"{percent_change_24h:.2f}",
-                "Market Cap (USD)": f"{market_cap:.2f}".rstrip('0').rstrip('.'),
-            })
+            coins.append((
+                str(idx),
+                coin["name"],
+                coin["symbol"].upper(),
+                f"{coin['current_price']:.8f}".rstrip('0').rstrip('.'),
+                f"{coin['price_change_percentage_24h']:.2f}",
+                format(int(coin["market_cap"]), "d"),
+            ))
         except Exception as e:
             logging.warning(f"Failed to parse coin data: {e}")
     return coins
 
 
-def write_to_csv(coins: List[Dict[str, str]], filename: str) -> None:
+def write_to_csv(coins: List[Tuple[str, ...]], filename: str) -> None:
     """
     Writes coin data to CSV.
 
     Args:
-        coins: List of coin data dictionaries.
+        coins: Coin rows in FIELDNAMES order.
         filename: Output CSV filename.
     """
     if not coins:
         logging.error("No data to write.")
         return
     os.makedirs(os.path.dirname(filename), exist_ok=True)
-    fieldnames = ["Rank", "Name", "Symbol", "Price (USD)", "24h % Change", "Market Cap (USD)"]
-    with open(filename, "w", newline='', encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
+    with open(filename, "w", newline='', encoding="utf-8", buffering=1 << 20) as f:
+        writer = csv.writer(f)
+        writer.writerow(FIELDNAMES)
         writer.writerows(coins)
     logging.info(f"Wrote {len(coins)} records to {filename}")
 